@@ -1,31 +1,119 @@
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List,Dict, Union
-import json
+from typing import Any, AsyncIterator, BinaryIO, Callable, List,Dict, Optional, Tuple, Union
+import asyncio
+from datetime import datetime
+from contextlib import asynccontextmanager
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
 from json import JSONDecodeError
-from openai import OpenAI
+import multiprocessing
+import orjson
+import threading
+import time
+import uuid
+import httpx
+from openai import APIConnectionError, AsyncOpenAI, InternalServerError, RateLimitError
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 import os
 import PyPDF2
+import pypdfium2 as pdfium
+from pdf_pages import extract_page_range
 from docx import Document
 from io import BytesIO
-import pandas as pd
+import numpy as np
+import tiktoken
+import xlsxwriter
+from diskcache import Cache
 from dotenv import load_dotenv
 
 load_dotenv()
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# Shared HTTP/2 pool so concurrent OpenAI calls reuse warm TLS connections
+http_client = httpx.AsyncClient(
+    # limits must be set on the transport: httpx ignores client-level limits when a transport is given
+    transport=httpx.AsyncHTTPTransport(
+        retries=0,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+    ),
+    timeout=httpx.Timeout(60, connect=5),
+)
+client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"), http_client=http_client)
+# Chat completions are retried by tenacity (see create_chat_completion), so the
+# SDK's own retries are switched off for them to avoid stacking the two. A batch
+# of resumes is one non-streamed generation that can run for minutes, so the
+# read timeout is much longer than the 60s used for batch/file calls.
+completion_client = client.with_options(max_retries=0, timeout=httpx.Timeout(300, connect=5))
+OPENAI_MODEL = "gpt-4o-mini"
 
-app = FastAPI(title="Resume Ranking API", version="1.0.0")
+# Caps in-flight OpenAI requests so large batches stay under the account's RPM limit
+OPENAI_CONCURRENCY = 20
+openai_semaphore = asyncio.Semaphore(OPENAI_CONCURRENCY)
+
+# Resumes are packed into shared prompts, bounded by count and by input tokens.
+# The budget sits well below RESUME_BATCH_SIZE * RESUME_TOKEN_LIMIT so batches of
+# long resumes shrink (four at the cap) and their generations stay short.
+RESUME_BATCH_SIZE = 8
+RESUME_BATCH_TOKEN_BUDGET = 16000
+# Anything past this many tokens is rarely useful signal (references, long project write-ups)
+RESUME_TOKEN_LIMIT = 4000
+encoding = tiktoken.encoding_for_model(OPENAI_MODEL)
+
+# Evaluations are cached per resume text, criteria and model so re-scoring is free
+evaluation_cache = Cache("./cache")
+
+# In-process registry of Batch API jobs submitted through /score-resumes-batch
+batch_jobs: Dict[str, Dict] = {}
+BATCH_POLL_INTERVAL = 30
+# Slightly longer than the 24h completion window, after which OpenAI expires the batch
+BATCH_POLL_TIMEOUT = 25 * 60 * 60
+# Finished jobs hold every extracted resume, so they're only kept long enough to be downloaded
+BATCH_JOB_TTL = 60 * 60
+
+# PDF/DOCX parsing is blocking, so it runs here instead of on the event loop
+extraction_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+# PDFium is not thread-safe, so calls into it from the pool are serialized
+pdfium_lock = threading.Lock()
+# Long PDFs that fall back to PyPDF2 (pure Python, holds the GIL) are split into
+# page ranges parsed in separate processes; spawn avoids forking a process that
+# runs threads. PDFium is native and fast enough that it always runs in one pass.
+PDF_PARALLEL_PAGE_THRESHOLD = 10
+PDF_PAGE_WORKERS = 4
+pdf_page_pool = ProcessPoolExecutor(max_workers=PDF_PAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await http_client.aclose()
+    pdf_page_pool.shutdown()
+
+app = FastAPI(title="Resume Ranking API", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 class ExtractCriteriaResponse(BaseModel):
     criteria: List[str]
 
+CRITERIA_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "job_criteria",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"criteria": {"type": "array", "items": {"type": "string"}}},
+            "required": ["criteria"],
+            "additionalProperties": False
+        }
+    }
+}
+
 
 def parse_criteria(criteria_input: Union[str, Dict, ExtractCriteriaResponse]) -> List[str]:
     try:
         if isinstance(criteria_input, str):
-            parsed = json.loads(criteria_input)
+            parsed = orjson.loads(criteria_input)
             if isinstance(parsed, dict) and "criteria" in parsed:
                 return parsed["criteria"]
             raise ValueError("JSON must contain a 'criteria' key with an array value")
@@ -46,30 +134,91 @@ def parse_criteria(criteria_input: Union[str, Dict, ExtractCriteriaResponse]) ->
     except Exception as e:
         raise ValueError(f"Error parsing criteria: {str(e)}")
 
-def extract_text_from_file(file: UploadFile) -> str:
-    content = file.file.read()
-    if file.filename.endswith('.pdf'):
-        pdf_reader = PyPDF2.PdfReader(BytesIO(content))
-        text = ''.join([page.extract_text() for page in pdf_reader.pages])
-    elif file.filename.endswith('.docx'):
-        doc = Document(BytesIO(content))
-        text = '\n'.join([para.text for para in doc.paragraphs])
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported file type. Only PDF and DOCX are allowed.")
+def _is_retryable(e: BaseException) -> bool:
+    # An exhausted quota also comes back as a 429 but will never succeed on retry
+    if isinstance(e, RateLimitError):
+        return e.code != "insufficient_quota"
+    return isinstance(e, (APIConnectionError, InternalServerError))
+
+@retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_random_exponential(min=1, max=30),
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
+async def create_chat_completion(**kwargs):
+    async with openai_semaphore:
+        return await completion_client.chat.completions.create(**kwargs)
+
+def _pdfium_page_text(pdf: pdfium.PdfDocument, idx: int) -> str:
+    page = pdf[idx]
+    textpage = page.get_textpage()
+    text = textpage.get_text_bounded()
+    textpage.close()
+    page.close()
     return text
 
+def _extract_pdf(stream: BinaryIO) -> str:
+    try:
+        # pypdfium2 needs readinto(), which SpooledTemporaryFile only has from Python 3.11
+        source = stream if hasattr(stream, 'readinto') else stream.read()
+        with pdfium_lock:
+            pdf = pdfium.PdfDocument(source)
+            try:
+                return ''.join(_pdfium_page_text(pdf, idx) for idx in range(len(pdf)))
+            finally:
+                pdf.close()
+    except pdfium.PdfiumError:
+        # Fall back to PyPDF2 for files PDFium can't open, e.g. some encrypted PDFs
+        stream.seek(0)
+        content = stream.read()
+        pdf_reader = PyPDF2.PdfReader(BytesIO(content))
+        page_count = len(pdf_reader.pages)
+        if page_count <= PDF_PARALLEL_PAGE_THRESHOLD:
+            return ''.join([page.extract_text() for page in pdf_reader.pages])
+        step = -(-page_count // PDF_PAGE_WORKERS)
+        ranges = [(content, start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        return ''.join(pdf_page_pool.map(extract_page_range, ranges))
+
+def _extract_docx(stream: BinaryIO) -> str:
+    doc = Document(stream)
+    return '\n'.join([para.text for para in doc.paragraphs])
+
+EXTRACTORS: Dict[str, Callable[[BinaryIO], str]] = {
+    '.pdf': _extract_pdf,
+    '.docx': _extract_docx,
+}
+
+def get_extractor(filename: str) -> Callable[[BinaryIO], str]:
+    extractor = EXTRACTORS.get(os.path.splitext(filename)[1].lower())
+    if extractor is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file format for {filename}. Only PDF and DOCX files are accepted."
+        )
+    return extractor
+
+async def run_extraction(file: UploadFile, func: Callable[[BinaryIO], Any]) -> Any:
+    # Parse straight from the spooled upload rather than copying it into memory
+    await file.seek(0)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(extraction_pool, func, file.file)
+
+async def extract_text_from_file(file: UploadFile) -> str:
+    return await run_extraction(file, get_extractor(file.filename))
+
 @app.post("/extract-criteria", response_model=ExtractCriteriaResponse, summary="Extract ranking criteria from job description")
 async def extract_criteria(file: UploadFile = File(..., description="Job description file (PDF or DOCX)")):
     try:
-        text = extract_text_from_file(file)
+        text = await extract_text_from_file(file)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        response = await create_chat_completion(
+            model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": """Analyze the job description and extract only the essential criteria that directly help evaluate candidate qualifications. Focus on:
 
@@ -100,19 +249,48 @@ async def extract_criteria(file: UploadFile = File(..., description="Job descrip
                 
                 {"role": "user", "content": text}
             ],
-            response_format={"type": "json_object"}
+            response_format=CRITERIA_RESPONSE_FORMAT
         )
-        result = json.loads(response.choices[0].message.content)
-        criteria = result.get('criteria', [])
-        if not isinstance(criteria, list):
-            criteria = []
-        return {"criteria": criteria}
+        return orjson.loads(response.choices[0].message.content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
 
-def evaluate_resume(text: str, criteria: List[str]) -> Dict:
-    prompt = f"""
-    Evaluate the following resume against the given criteria. For each criterion:
+def truncate_resume(text: str) -> Tuple[str, int]:
+    # Resumes are plain text, so special-token strings like <|endoftext|> are encoded as ordinary text
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) > RESUME_TOKEN_LIMIT:
+        tokens = tokens[:RESUME_TOKEN_LIMIT]
+        text = encoding.decode(tokens)
+    return text, len(tokens)
+
+def _extract_resume(extractor: Callable[[BinaryIO], str], prompt_head: str, stream: BinaryIO) -> Tuple[str, int, Optional[Dict]]:
+    # Tokenizing and the SQLite cache lookup happen here on the extraction pool
+    # so neither blocks the event loop
+    text, tokens = truncate_resume(extractor(stream))
+    return text, tokens, evaluation_cache.get(evaluation_cache_key(text, prompt_head))
+
+async def batch_resumes(resumes: AsyncIterator[Tuple[str, str, int]]) -> AsyncIterator[List[Tuple[str, str]]]:
+    batch = []
+    batch_tokens = 0
+    async for resume_id, text, tokens in resumes:
+        if batch and (len(batch) >= RESUME_BATCH_SIZE or batch_tokens + tokens > RESUME_BATCH_TOKEN_BUDGET):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append((resume_id, text))
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+def evaluation_cache_key(text: str, prompt_head: str) -> str:
+    payload = text + prompt_head + OPENAI_MODEL
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def build_evaluation_prompt_head(criteria_list: List[str]) -> str:
+    criteria_json = orjson.dumps(criteria_list).decode()
+    return f"""You are an expert resume evaluator.
+    
+    Evaluate the resumes in the user message against the given criteria. Each resume starts with a "--- RESUME <id> ---" line. For each resume and each criterion:
     - Assign a score from 0-5 where:
       0: No relevant experience/qualification
       1: Minimal match
@@ -121,36 +299,88 @@ def evaluate_resume(text: str, criteria: List[str]) -> Dict:
     - Consider both explicit mentions and implied experience
     - Extract the candidate's name from the resume
     
-    Resume:
-    {text}
-    
     Criteria to evaluate:
-    {json.dumps(criteria, indent=2)}
+    {criteria_json}
     
-    Return a JSON object with:
-    1. "name": Candidate's full name (or "Unknown" if not found)
-    2. "scores": Dictionary mapping each criterion to its score (0-5)
-    3. "explanations": Brief explanation for each score
+    Return a JSON object with a "results" array containing one entry per resume, each with:
+    1. "id": The resume id from its "--- RESUME <id> ---" line
+    2. "name": Candidate's full name (or "Unknown" if not found)
+    3. "scores": Dictionary mapping each criterion to its score (0-5)
+    4. "explanations": Brief explanation for each score
     """
-    
+
+def _criteria_object_schema(criteria_keys: List[str], value_schema: Dict) -> Dict:
+    return {
+        "type": "object",
+        "properties": {criterion: value_schema for criterion in criteria_keys},
+        "required": criteria_keys,
+        "additionalProperties": False
+    }
+
+def build_evaluation_response_format(criteria_list: List[str]) -> Dict:
+    # Strict structured outputs can't describe free-form keys, so every criterion is spelled out
+    criteria_keys = list(dict.fromkeys(criteria_list))
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "resume_evaluations",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "id": {"type": "string"},
+                                "name": {"type": "string"},
+                                "scores": _criteria_object_schema(criteria_keys, {"type": "integer", "enum": [0, 1, 2, 3, 4, 5]}),
+                                "explanations": _criteria_object_schema(criteria_keys, {"type": "string"})
+                            },
+                            "required": ["id", "name", "scores", "explanations"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["results"],
+                "additionalProperties": False
+            }
+        }
+    }
+
+def build_evaluation_messages(resumes: List[Tuple[str, str]], prompt_head: str) -> List[Dict]:
+    resume_blocks = "\n\n".join(f"--- RESUME {resume_id} ---\n{text}" for resume_id, text in resumes)
+    # The per-request head goes first, byte-identical across batches, so OpenAI's
+    # prompt caching can reuse it; only the resumes differ between calls
+    return [
+        {"role": "system", "content": prompt_head},
+        {"role": "user", "content": resume_blocks}
+    ]
+
+def parse_evaluation_results(content: str) -> Dict[str, Dict]:
+    return {result['id']: result for result in orjson.loads(content)['results']}
+
+def cache_evaluations(resumes: List[Tuple[str, str]], prompt_head: str, results: Dict[str, Dict]):
+    for resume_id, text in resumes:
+        if resume_id in results:
+            evaluation_cache.set(evaluation_cache_key(text, prompt_head), results[resume_id])
+
+async def evaluate_resumes_batch(resumes: List[Tuple[str, str]], prompt_head: str, response_format: Dict) -> Dict[str, Dict]:
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert resume evaluator."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
+        response = await create_chat_completion(
+            model=OPENAI_MODEL,
+            messages=build_evaluation_messages(resumes, prompt_head),
+            response_format=response_format
         )
-        return json.loads(response.choices[0].message.content)
+        results = parse_evaluation_results(response.choices[0].message.content)
     except Exception as e:
-        raise ValueError(f"Error evaluating resume: {str(e)}")
+        raise ValueError(f"Error evaluating resumes: {str(e)}")
 
-@app.post("/score-resumes")
-async def score_resumes(
-    criteria: Union[str, Dict, ExtractCriteriaResponse] = Form(..., description="Ranking criteria as JSON string or object"),
-    files: List[UploadFile] = File(..., description="Resume files (PDF or DOCX)"),
-):
+    await asyncio.get_running_loop().run_in_executor(extraction_pool, cache_evaluations, resumes, prompt_head, results)
+    return results
+
+def validate_score_request(criteria: Union[str, Dict, ExtractCriteriaResponse], files: List[UploadFile]) -> List[str]:
     try:
         criteria_list = parse_criteria(criteria)
         if not criteria_list:
@@ -160,34 +390,58 @@ async def score_resumes(
     
     if not files:
         raise HTTPException(status_code=400, detail="At least one resume file is required")
-        
-    for file in files:
-        if not file.filename.lower().endswith(('.pdf', '.docx')):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file format for {file.filename}. Only PDF and DOCX files are accepted."
-            )
-    
-    rows = []
-    errors = []
-    
-    for file in files:
+    return criteria_list
+
+async def iter_pending_resumes(
+    files: List[UploadFile],
+    prompt_head: str,
+    extracted: List[Tuple[str, str]],
+    results: Dict,
+    errors: List[str],
+) -> AsyncIterator[Tuple[str, str, int]]:
+    # Resolving extractors up front rejects unsupported files before any parsing starts
+    extractors = [get_extractor(file.filename) for file in files]
+    tasks = [
+        asyncio.create_task(run_extraction(file, partial(_extract_resume, extractor, prompt_head)))
+        for file, extractor in zip(files, extractors)
+    ]
+
+    # Resumes are handed on in upload order as soon as each is parsed, so
+    # evaluation of early batches overlaps with parsing of later files
+    for file, task in zip(files, tasks):
         try:
-            text = extract_text_from_file(file)
+            text, tokens, cached = await task
+        except Exception as e:
+            errors.append(f"Error processing {file.filename}: {str(e)}")
+            continue
+
+        resume_id = str(len(extracted))
+        extracted.append((file.filename, text))
+        if cached is not None:
+            results[resume_id] = cached
+        else:
+            yield resume_id, text, tokens
 
-            result = evaluate_resume(text, criteria_list)
+def build_rows(extracted: List[Tuple[str, str]], results: Dict, criteria_list: List[str], errors: List[str]) -> List[Dict]:
+    rows = []
+
+    for idx, (filename, _) in enumerate(extracted):
+        try:
+            result = results.get(str(idx), ValueError("No evaluation returned for resume"))
+            if isinstance(result, Exception):
+                raise result
 
             row = {
-                "Filename": file.filename,
-                "Candidate Name": result.get('name', 'Unknown')
+                "Filename": filename,
+                "Candidate Name": result['name']
             }
 
-            scores = result.get('scores', {})
-            explanations = result.get('explanations', {})
+            scores = result['scores']
+            explanations = result['explanations']
             
             for criterion in criteria_list:
-                row[f"{criterion} (Score)"] = scores.get(criterion, 0)
-                row[f"{criterion} (Explanation)"] = explanations.get(criterion, "No explanation provided")
+                row[f"{criterion} (Score)"] = scores[criterion]
+                row[f"{criterion} (Explanation)"] = explanations[criterion]
 
             row["Total Score"] = sum(scores.values())
             row["Average Score"] = round(sum(scores.values()) / len(criteria_list), 2)
@@ -195,7 +449,7 @@ async def score_resumes(
             rows.append(row)
             
         except Exception as e:
-            errors.append(f"Error processing {file.filename}: {str(e)}")
+            errors.append(f"Error processing {filename}: {str(e)}")
             continue
     
     if not rows:
@@ -203,35 +457,217 @@ async def score_resumes(
             status_code=400,
             detail="No resumes could be processed successfully. Errors: " + "; ".join(errors)
         )
-    
-    df = pd.DataFrame(rows)
-    
-    score_cols = [col for col in df.columns if "Score" in col]
-    explanation_cols = [col for col in df.columns if "Explanation" in col]
-    base_cols = ["Filename", "Candidate Name"]
-    
-    df = df[base_cols + score_cols + explanation_cols]
+    return rows
+
+def build_excel_response(rows: List[Dict], criteria_list: List[str]) -> StreamingResponse:
+    headers = (
+        ["Filename", "Candidate Name"]
+        + [f"{criterion} (Score)" for criterion in criteria_list]
+        + ["Total Score", "Average Score"]
+        + [f"{criterion} (Explanation)" for criterion in criteria_list]
+    )
+    values = [[row[header] for header in headers] for row in rows]
+
+    cell_widths = np.char.str_len(np.array(values, dtype=str)).max(axis=0)
+    header_widths = np.fromiter((len(header) for header in headers), dtype=int)
 
+    # constant_memory flushes each row as it is written, so columns are sized
+    # up front and rows go out strictly in order
     output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Resume Scores', index=False)
-
-        worksheet = writer.sheets['Resume Scores']
-        for idx, col in enumerate(df.columns):
-            max_length = max(
-                df[col].astype(str).apply(len).max(),
-                len(col)
-            )
-            worksheet.set_column(idx, idx, max_length + 2)
+    with xlsxwriter.Workbook(output, {'constant_memory': True}) as workbook:
+        worksheet = workbook.add_worksheet('Resume Scores')
+        for idx, width in enumerate(np.maximum(cell_widths, header_widths) + 2):
+            worksheet.set_column(idx, idx, int(width))
+
+        header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        worksheet.write_row(0, 0, headers, header_format)
+        for row_idx, row_values in enumerate(values, start=1):
+            worksheet.write_row(row_idx, 0, row_values)
     
     output.seek(0)
     
     return StreamingResponse(
         output,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=resume_scores_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx"}
+        headers={"Content-Disposition": f"attachment; filename=resume_scores_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"}
     )
 
+@app.post("/score-resumes")
+async def score_resumes(
+    criteria: Union[str, Dict, ExtractCriteriaResponse] = Form(..., description="Ranking criteria as JSON string or object"),
+    files: List[UploadFile] = File(..., description="Resume files (PDF or DOCX)"),
+):
+    criteria_list = validate_score_request(criteria, files)
+    prompt_head = build_evaluation_prompt_head(criteria_list)
+    response_format = build_evaluation_response_format(criteria_list)
+    
+    errors = []
+    extracted = []
+    results = {}
+    batches = []
+    tasks = []
+    async for batch in batch_resumes(iter_pending_resumes(files, prompt_head, extracted, results, errors)):
+        batches.append(batch)
+        tasks.append(asyncio.create_task(evaluate_resumes_batch(batch, prompt_head, response_format)))
+
+    batch_results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    for batch, batch_result in zip(batches, batch_results):
+        for resume_id, _ in batch:
+            if isinstance(batch_result, Exception):
+                results[resume_id] = batch_result
+            elif resume_id in batch_result:
+                results[resume_id] = batch_result[resume_id]
+
+    rows = build_rows(extracted, results, criteria_list, errors)
+    return build_excel_response(rows, criteria_list)
+
+def finish_batch_job(job_id: str, status: str):
+    batch_jobs[job_id]["status"] = status
+    asyncio.get_running_loop().call_later(BATCH_JOB_TTL, batch_jobs.pop, job_id, None)
+
+async def record_batch_output(job: Dict, content: str):
+    # Output and error files share the same line format; failed requests carry an error body
+    for line in content.splitlines():
+        record = orjson.loads(line)
+        resumes = job["batches"][int(record["custom_id"])]
+        response = record.get("response") or {}
+        try:
+            if response.get("status_code") != 200:
+                error = (response.get("body") or {}).get("error") or record.get("error") or {}
+                raise ValueError(error.get("message") or f"Batch request failed with status {response.get('status_code')}")
+            results = parse_evaluation_results(response["body"]["choices"][0]["message"]["content"])
+        except Exception as e:
+            for resume_id, _ in resumes:
+                job["results"][resume_id] = ValueError(f"Error evaluating resumes: {str(e)}")
+            continue
+        await asyncio.get_running_loop().run_in_executor(extraction_pool, cache_evaluations, resumes, job["prompt_head"], results)
+        for resume_id, _ in resumes:
+            job["results"][resume_id] = results.get(resume_id, ValueError("No evaluation returned for resume"))
+
+async def poll_batch_job(job_id: str):
+    job = batch_jobs[job_id]
+    deadline = time.monotonic() + BATCH_POLL_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            batch = await client.batches.retrieve(job["batch_id"])
+        except Exception:
+            # A transient API error must not abandon a batch that is still running (and billed)
+            pass
+        else:
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                break
+        await asyncio.sleep(BATCH_POLL_INTERVAL)
+    else:
+        job["errors"].append("Timed out waiting for OpenAI batch")
+        finish_batch_job(job_id, "failed")
+        return
+
+    try:
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                output = await client.files.content(file_id)
+                await record_batch_output(job, output.text)
+    except Exception as e:
+        job["errors"].append(f"OpenAI API error: {str(e)}")
+        finish_batch_job(job_id, "failed")
+        return
+
+    if batch.status != "completed":
+        job["errors"].append(f"OpenAI batch {batch.status}")
+    finish_batch_job(job_id, "completed" if batch.status == "completed" else "failed")
+
+@app.post("/score-resumes-batch", summary="Submit resumes for scoring via the OpenAI Batch API")
+async def score_resumes_batch(
+    criteria: Union[str, Dict, ExtractCriteriaResponse] = Form(..., description="Ranking criteria as JSON string or object"),
+    files: List[UploadFile] = File(..., description="Resume files (PDF or DOCX)"),
+):
+    criteria_list = validate_score_request(criteria, files)
+    prompt_head = build_evaluation_prompt_head(criteria_list)
+    response_format = build_evaluation_response_format(criteria_list)
+    
+    errors = []
+    extracted = []
+    results = {}
+    batches = [
+        batch async for batch in batch_resumes(iter_pending_resumes(files, prompt_head, extracted, results, errors))
+    ]
+
+    if not extracted:
+        raise HTTPException(
+            status_code=400,
+            detail="No resumes could be processed successfully. Errors: " + "; ".join(errors)
+        )
+
+    job_id = str(uuid.uuid4())
+    job = {
+        "status": "in_progress",
+        "criteria": criteria_list,
+        "prompt_head": prompt_head,
+        "extracted": extracted,
+        "batches": batches,
+        "results": results,
+        "errors": errors,
+    }
+
+    if batches:
+        lines = [
+            orjson.dumps({
+                "custom_id": str(idx),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": OPENAI_MODEL,
+                    "messages": build_evaluation_messages(batch, prompt_head),
+                    "response_format": response_format
+                }
+            })
+            for idx, batch in enumerate(batches)
+        ]
+        try:
+            input_file = await client.files.create(
+                file=("resume_batch.jsonl", b"\n".join(lines)),
+                purpose="batch"
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
+
+        try:
+            batch = await client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        except Exception as e:
+            # Don't leave the uploaded input file behind when no batch will consume it
+            try:
+                await client.files.delete(input_file.id)
+            except Exception:
+                pass
+            raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
+
+        job["batch_id"] = batch.id
+
+    batch_jobs[job_id] = job
+    if batches:
+        job["task"] = asyncio.create_task(poll_batch_job(job_id))
+    else:
+        finish_batch_job(job_id, "completed")
+
+    return {"job_id": job_id, "status": job["status"], "status_url": f"/score-resumes-batch/{job_id}"}
+
+@app.get("/score-resumes-batch/{job_id}", summary="Check a batch scoring job and download its results")
+async def get_score_resumes_batch(job_id: str):
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch job {job_id}")
+
+    if job["status"] != "completed":
+        return {"job_id": job_id, "status": job["status"], "errors": job["errors"]}
+
+    rows = build_rows(job["extracted"], job["results"], job["criteria"], list(job["errors"]))
+    return build_excel_response(rows, job["criteria"])
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,11 @@
+from io import BytesIO
+from typing import Tuple
+import PyPDF2
+
+# Runs in the PDF page worker processes, so this module must stay free of
+# import-time side effects (no clients, caches or pools like main.py has)
+
+def extract_page_range(args: Tuple[bytes, int, int]) -> str:
+    content, start, stop = args
+    pdf_reader = PyPDF2.PdfReader(BytesIO(content))
+    return ''.join([pdf_reader.pages[idx].extract_text() for idx in range(start, stop)])